@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+HELIOS magnet dashboard: the Siemens MPS and the Oxford supervisory side
+by side (or stacked on narrow terminals) with a shared command line.
+
+Each device feeds its own render_raw.Terminal from a reader thread, so
+incoming data is never dropped while a command is being typed. The main
+loop only redraws cells that changed since the previous frame.
+
+Keys:  Tab          switch the command target (MPS / Oxford)
+       Enter        send the command line (+ CR) to the target
+       Esc          clear the command line
+       exit / quit  (as a command) or Ctrl-C to leave
+
+Note: the Oxford port is also used by monitor.py; do not run both at once.
+
+Usage: python3 dashboard.py [--oxford-refresh SECONDS] [--no-oxford] [--no-mps]
+"""
+import argparse
+import curses
+import locale
+import queue
+import threading
+import time
+
+import serial
+
+from render_raw import Terminal
+from MPSControl import PORT as MPS_PORT, BAUD as MPS_BAUD
+
+OXFORD_PORT = '/dev/ttyUSB1'
+OXFORD_BAUD = 4800
+
+FRAME_S = 0.05   # input poll / redraw interval
+
+
+class Device:
+    """One serial device: port, terminal model and a background reader."""
+
+    def __init__(self, name, port, baud, rows, cols=80):
+        self.name = name
+        self.port = port
+        self.baud = baud
+        self.term = Terminal(rows=rows, cols=cols)
+        self.inbox = queue.Queue()
+        self.status = "connecting"
+        self.ser = None
+
+    def open(self):
+        try:
+            self.ser = serial.Serial(self.port, self.baud, timeout=0.2)
+        except serial.SerialException as e:
+            self.status = f"error: {e}"
+            return False
+        self.status = "connected"
+        threading.Thread(target=self._read, daemon=True).start()
+        return True
+
+    def _read(self):
+        while self.ser.is_open:
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
+            except (serial.SerialException, OSError) as e:
+                self.status = f"error: {e}"
+                return
+            if data:
+                self.inbox.put(data.decode('ascii', errors='ignore'))
+
+    def drain(self):
+        """Move everything the reader has queued into the terminal model."""
+        chunks = []
+        while True:
+            try:
+                chunks.append(self.inbox.get_nowait())
+            except queue.Empty:
+                break
+        if chunks:
+            self.term.feed("".join(chunks))
+
+    def send(self, text):
+        if self.ser and self.ser.is_open:
+            self.ser.write((text + "\r").encode('ascii', errors='ignore'))
+
+    def close(self):
+        if self.ser and self.ser.is_open:
+            self.ser.close()
+
+
+def oxford_wake(dev, refresh):
+    """Wake the Oxford unit like monitor.py does, then request the R display every refresh s."""
+    dev.ser.write(b'\x1B')
+    time.sleep(2)
+    dev.ser.write(b'\r')
+    time.sleep(6)
+    while dev.ser.is_open:
+        dev.send("R")
+        if refresh <= 0:
+            return
+        time.sleep(refresh)
+
+
+class Pane:
+    """A curses window showing one Terminal, tracking what is already on screen."""
+
+    def __init__(self, dev, y, x, h, w):
+        self.dev = dev
+        self.win = curses.newwin(h, w, y, x)
+        self.h = h
+        self.w = w
+        self.shown = {}   # pane row -> (chars, attrs) as last drawn
+        self.top = 0      # first terminal row shown
+        title = f" {dev.name} {dev.port} "
+        self.win.addnstr(0, 0, title.ljust(w, "─"), w - 1, curses.A_BOLD)
+        self.status = None
+
+    def draw(self):
+        """Draw the changed cells; return True if anything was written."""
+        t = self.dev.term
+        changed = False
+        if self.dev.status != self.status:
+            self.status = self.dev.status
+            self.win.addnstr(0, max(0, self.w - 30), f" {self.status} ".rjust(29, "─")[:29],
+                             29, curses.A_BOLD)
+            changed = True
+        # a pane shorter than the device screen follows the cursor row
+        top = max(0, min(t.r + 1, t.rows) - (self.h - 1))
+        dirty = t.take_dirty()
+        if top != self.top:
+            self.top = top
+            dirty = range(t.rows)
+        for r in dirty:
+            y = r - self.top
+            if not 0 <= y < self.h - 1:
+                continue
+            chars = t.buf[r][:self.w]
+            attrs = t.attr[r][:self.w]
+            old_c, old_a = self.shown.get(y, ([" "] * len(chars), [False] * len(attrs)))
+            diff = [c for c in range(len(chars)) if chars[c] != old_c[c] or attrs[c] != old_a[c]]
+            if not diff:
+                continue
+            # redraw only the span that changed, split into reverse/normal runs
+            c = diff[0]
+            end = diff[-1] + 1
+            while c < end:
+                run = c
+                while run < end and attrs[run] == attrs[c]:
+                    run += 1
+                try:
+                    self.win.addstr(y + 1, c, "".join(chars[c:run]),
+                                    curses.A_REVERSE if attrs[c] else curses.A_NORMAL)
+                except curses.error:
+                    pass  # writing the bottom-right cell moves the cursor off-window
+                c = run
+            self.shown[y] = (list(chars), list(attrs))
+            changed = True
+        if changed:
+            self.win.noutrefresh()
+        return changed
+
+
+def _layout(stdscr, devices):
+    """Side by side if both 80-column screens fit, otherwise stacked; command line at the bottom."""
+    stdscr.clear()
+    stdscr.refresh()
+    for dev in devices:
+        dev.term.dirty.update(range(dev.term.rows))
+    H, W = stdscr.getmaxyx()
+    body = H - 1
+    n = len(devices)
+    panes = []
+    if n > 1 and W >= n * 81:
+        w = W // n
+        for i, dev in enumerate(devices):
+            panes.append(Pane(dev, 0, i * w, body, w))
+    else:
+        h = body // n
+        for i, dev in enumerate(devices):
+            panes.append(Pane(dev, i * h, 0, h if i < n - 1 else body - i * h, W))
+    cmdwin = curses.newwin(1, W, H - 1, 0)
+    cmdwin.timeout(int(FRAME_S * 1000))
+    cmdwin.keypad(True)
+    return panes, cmdwin
+
+
+def run(stdscr, devices):
+    curses.curs_set(1)
+    panes, cmdwin = _layout(stdscr, devices)
+    target = 0
+    line = ""
+    prompt_dirty = True
+
+    while True:
+        for dev in devices:
+            dev.drain()
+        for pane in panes:
+            pane.draw()
+
+        if prompt_dirty:
+            W = cmdwin.getmaxyx()[1]
+            prompt = f"[{devices[target].name}]> "
+            cmdwin.erase()
+            cmdwin.addnstr(0, 0, prompt + line[-(W - len(prompt) - 1):], W - 1)
+            prompt_dirty = False
+        cmdwin.noutrefresh()   # last, so the cursor sits on the command line
+        curses.doupdate()
+
+        try:
+            key = cmdwin.get_wch()   # waits at most FRAME_S
+        except curses.error:
+            continue
+        prompt_dirty = True
+        if key == curses.KEY_RESIZE:
+            panes, cmdwin = _layout(stdscr, devices)
+        elif key == "\t":
+            target = (target + 1) % len(devices)
+        elif key in ("\n", "\r", curses.KEY_ENTER):
+            if line.strip().lower() in ("exit", "quit"):
+                return
+            if line.strip():
+                devices[target].send(line)
+            line = ""
+        elif key == "\x1b":
+            line = ""
+        elif key in (curses.KEY_BACKSPACE, "\x7f", "\b"):
+            line = line[:-1]
+        elif isinstance(key, str) and key.isprintable():
+            line += key
+
+
+def main():
+    ap = argparse.ArgumentParser(description="HELIOS MPS + Oxford supervisory dashboard")
+    ap.add_argument("--oxford-refresh", type=float, default=60,
+                    help="seconds between R requests to the Oxford unit (0 = once)")
+    ap.add_argument("--no-oxford", action="store_true", help="do not open the Oxford port")
+    ap.add_argument("--no-mps", action="store_true", help="do not open the MPS port")
+    args = ap.parse_args()
+
+    devices = []
+    if not args.no_mps:
+        devices.append(Device("MPS", MPS_PORT, MPS_BAUD, rows=24))
+    if not args.no_oxford:
+        devices.append(Device("Oxford", OXFORD_PORT, OXFORD_BAUD, rows=40))
+    if not devices:
+        ap.error("nothing to show")
+
+    for dev in devices:
+        if dev.open() and dev.name == "Oxford":
+            threading.Thread(target=oxford_wake, args=(dev, args.oxford_refresh),
+                             daemon=True).start()
+
+    locale.setlocale(locale.LC_ALL, "")
+    try:
+        curses.wrapper(run, devices)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for dev in devices:
+            dev.close()
+        print("Disconnected.")
+
+
+if __name__ == "__main__":
+    main()
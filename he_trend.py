@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Streaming trend estimate for the He level and shield temperature.
+
+Each monitor run adds one sample to an exponentially weighted linear fit
+of value against time. Only the weighted sums are kept (in a small JSON
+state file), so an update is O(1) and never re-reads history.
+
+The time origin is moved to the newest sample on every update, so the fit
+intercept is the smoothed "value now" and the slope is the rate per hour.
+
+Usage: python3 he_trend.py [state.json]     (print the current estimate)
+"""
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+STATE_FILE = "he_trend.json"
+
+TAU_HOURS = 24.0       # e-folding time of the sample weights
+MIN_SPAN_HOURS = 1.0   # weighted time spread needed before a slope is trusted
+FILL_JUMP = 2.0        # level rise (%) above the fit that counts as a refill
+
+# He level thresholds (%) for the projection; keep in step with the
+# NOUT_HE_WARN / NOUT_HE_ALARM settings on the supervisory.
+HE_WARN_LEVEL  = 50.0
+HE_ALARM_LEVEL = 40.0
+
+
+class TrendFit:
+    """Exponentially weighted least-squares line through (time, value) samples."""
+
+    def __init__(self, tau_hours=TAU_HOURS):
+        self.tau = tau_hours
+        self.reset()
+
+    def reset(self):
+        self.t_last = None   # unix time of newest sample (time origin)
+        self.sw  = 0.0       # sum of weights
+        self.st  = 0.0       # sum w*t   (t in hours, relative to t_last)
+        self.sy  = 0.0       # sum w*y
+        self.stt = 0.0       # sum w*t*t
+        self.sty = 0.0       # sum w*t*y
+
+    def update(self, t, y):
+        """Add sample y taken at unix time t. Out-of-order samples are ignored."""
+        if self.t_last is not None:
+            dt = (t - self.t_last) / 3600.0
+            if dt < 0:
+                return
+            # shift origin to the new sample, then decay the old weights
+            self.stt = self.stt - 2 * dt * self.st + dt * dt * self.sw
+            self.sty = self.sty - dt * self.sy
+            self.st  = self.st - dt * self.sw
+            k = math.exp(-dt / self.tau)
+            self.sw  *= k
+            self.st  *= k
+            self.sy  *= k
+            self.stt *= k
+            self.sty *= k
+        self.t_last = t
+        # new sample sits at t = 0, so only sw and sy change
+        self.sw += 1.0
+        self.sy += y
+
+    def _denom(self):
+        return self.sw * self.stt - self.st * self.st
+
+    def slope(self):
+        """Rate of change per hour, or None until the samples span MIN_SPAN_HOURS."""
+        if self.sw <= 0:
+            return None
+        d = self._denom()
+        # d / sw^2 is the weighted variance of the sample times
+        if d <= self.sw * self.sw * MIN_SPAN_HOURS * MIN_SPAN_HOURS:
+            return None
+        return (self.sw * self.sty - self.st * self.sy) / d
+
+    def value(self):
+        """Fitted value at the newest sample time."""
+        if self.sw <= 0:
+            return None
+        m = self.slope()
+        if m is None:
+            return self.sy / self.sw
+        return (self.sy - m * self.st) / self.sw
+
+    def to_dict(self):
+        return {"t_last": self.t_last, "sw": self.sw, "st": self.st, "sy": self.sy,
+                "stt": self.stt, "sty": self.sty}
+
+    def load_dict(self, d):
+        self.t_last = d.get("t_last")
+        for k in ("sw", "st", "sy", "stt", "sty"):
+            setattr(self, k, float(d.get(k, 0.0)))
+
+
+def hours_to_level(level, rate, threshold):
+    """Hours until level falls to threshold at rate (%/h), or None if not falling."""
+    if level is None or rate is None or rate >= 0:
+        return None
+    if level <= threshold:
+        return 0.0
+    return (level - threshold) / -rate
+
+
+class HeTrend:
+    """He level and shield temperature trends, persisted between monitor runs."""
+
+    def __init__(self, state_path=STATE_FILE):
+        self.state_path = Path(state_path)
+        self.level  = TrendFit()
+        self.shield = TrendFit()
+        self.load()
+
+    def load(self):
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        self.level.load_dict(state.get("level", {}))
+        self.shield.load_dict(state.get("shield", {}))
+
+    def save(self):
+        state = {"level": self.level.to_dict(), "shield": self.shield.to_dict()}
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        tmp.replace(self.state_path)
+
+    def update(self, level, shield, t=None):
+        """Add one reading and return the derived telemetry fields."""
+        if t is None:
+            t = time.time()
+        fitted = self.level.value()
+        if fitted is not None and level > fitted + FILL_JUMP:
+            # magnet was refilled, the old slope no longer applies
+            self.level.reset()
+        self.level.update(t, level)
+        self.shield.update(t, shield)
+        return self.fields()
+
+    def fields(self):
+        """Telemetry fields; entries without enough data yet are left out."""
+        out = {}
+        rate = self.level.slope()
+        now  = self.level.value()
+        if rate is not None:
+            out["HeBoilOff"] = -rate   # %/h, positive while the level falls
+            warn  = hours_to_level(now, rate, HE_WARN_LEVEL)
+            alarm = hours_to_level(now, rate, HE_ALARM_LEVEL)
+            if warn is not None:
+                out["HeWarnHours"] = warn
+            if alarm is not None:
+                out["HeAlarmHours"] = alarm
+        drift = self.shield.slope()
+        if drift is not None:
+            out["HeTempDrift"] = drift  # K/h
+        return out
+
+
+def main():
+    trend = HeTrend(sys.argv[1] if len(sys.argv) >= 2 else STATE_FILE)
+    fields = trend.fields()
+    if not fields:
+        print("Not enough samples yet.")
+    for k, v in fields.items():
+        print(f"{k}: {v:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ import os
 import sys
 
 from render_raw import parse_raw
+from he_trend import HeTrend
+from screen_archive import ScreenArchive
 
 ##  OXFORD 601-048T
 
@@ -115,6 +117,12 @@ if __name__ == "__main__":
     with open("magnet_out.txt", "w", encoding="utf-8") as f:
         f.write("\n".join(lines) + "\n")
 
+    # keep every screen, magnet_out.txt only holds the latest one
+    try:
+        ScreenArchive().append("\n".join(lines) + "\n")
+    except Exception as e:
+        print(f"{now} - screen archive error: {e}")
+
     render_text_file_to_png("magnet_out.txt", "magnet_out.png")
     WriteDiscordFile("magnet_out.png")
 
@@ -129,9 +137,22 @@ if __name__ == "__main__":
     now = datetime.now().isoformat()
     print(f"{now} - He Level: {level}%, Shield Temp: {temp}K")
 
+    # update the boil-off / drift estimate with this one sample
+    try:
+        trend = HeTrend()
+        fields = trend.update(level, temp)
+        trend.save()
+    except Exception as e:
+        print(f"{now} - he trend error: {e}")
+        fields = {}
+    for name, value in fields.items():
+        print(f"{now} - {name}: {value:.3f}")
+
     #post to influxdb
     os.system(f'curl -s -XPOST "http://192.168.1.193:8086/write?db=testing" --data-binary "HeLevel value={level}" --max-time 1 --connect-timeout 1')
     os.system(f'curl -s -XPOST "http://192.168.1.193:8086/write?db=testing" --data-binary "HeTemp value={temp}" --max-time 1 --connect-timeout 1')
+    for name, value in fields.items():
+        os.system(f'curl -s -XPOST "http://192.168.1.193:8086/write?db=testing" --data-binary "{name} value={value:.4f}" --max-time 1 --connect-timeout 1')
     # os.system(f'curl -s -XPOST "http://192.168.1.193:8086/write?db=testing" --data-binary "HePressure value={pressure}" --max-time 1 --connect-timeout 1')
 
 
@@ -13,6 +13,9 @@ class Terminal:
         self.c = 0
         self.alt     = False
         self.reverse = False
+        self.dirty   = set(range(rows))  # rows changed since last take_dirty()
+        self._pending = ""               # incomplete escape sequence from feed()
+        self.scroll  = False             # live stream: scroll at the bottom instead of growing
         self.line_map = {
             "l": "┌", "k": "┐", "m": "└", "j": "┘", "q": "─", "x": "│",
             "t": "├", "u": "┬", "v": "┴", "w": "┼", "n": "┤",
@@ -21,20 +24,38 @@ class Terminal:
     def ensure_pos(self, r, c):
         if r < 0: r = 0
         if c < 0: c = 0
+        if self.scroll and r >= self.rows:
+            r = self.rows - 1
         if r >= self.rows:
             for _ in range(r - self.rows + 1):
                 self.buf.append([" "] * self.cols)
                 self.attr.append([False] * self.cols)
+                self.dirty.add(len(self.buf) - 1)
             self.rows = len(self.buf)
         self.r = r
         self.c = min(c, self.cols - 1)
 
+    def scroll_up(self):
+        """Drop the top row and add a blank one at the bottom."""
+        self.buf.pop(0)
+        self.attr.pop(0)
+        self.buf.append([" "] * self.cols)
+        self.attr.append([False] * self.cols)
+        self.dirty.update(range(self.rows))
+
+    def _next_line(self):
+        self.r += 1
+        if self.r >= self.rows:
+            if self.scroll:
+                self.scroll_up()
+                self.r = self.rows - 1
+            else:
+                self.ensure_pos(self.r, self.c)
+
     def write_char(self, ch):
         if ch == "\n":
-            self.r += 1
             self.c = 0
-            if self.r >= self.rows:
-                self.ensure_pos(self.r, self.c)
+            self._next_line()
             return
         if ch == "\r":
             self.c = 0
@@ -45,18 +66,18 @@ class Terminal:
         if 0 <= self.r < self.rows and 0 <= self.c < self.cols:
             self.buf[self.r][self.c]  = out
             self.attr[self.r][self.c] = self.reverse
+            self.dirty.add(self.r)
         self.c += 1
         if self.c >= self.cols:
             self.c = 0
-            self.r += 1
-            if self.r >= self.rows:
-                self.ensure_pos(self.r, self.c)
+            self._next_line()
 
     def clear_screen(self):
         for i in range(self.rows):
             for j in range(self.cols):
                 self.buf[i][j]  = " "
                 self.attr[i][j] = False
+        self.dirty.update(range(self.rows))
         self.r = 0
         self.c = 0
 
@@ -64,6 +85,7 @@ class Terminal:
         for j in range(self.c, self.cols):
             self.buf[self.r][j]  = " "
             self.attr[self.r][j] = False
+        self.dirty.add(self.r)
 
     def set_attrs(self, parts):
         """Parse SGR params and update reverse state."""
@@ -80,6 +102,27 @@ class Terminal:
                 self.reverse = False
             # other attributes (bold, underline, etc.) ignored for now
 
+    def feed(self, data, scroll=True):
+        """
+        Feed a chunk of a live stream. An escape sequence cut off at the end
+        of the chunk is held back and completed by the next call. With scroll
+        (the default) the screen keeps its size and scrolls at the bottom row,
+        unlike parse_raw() which grows to hold a whole capture.
+        """
+        self.scroll = scroll
+        data = self._pending + data
+        self._pending = ""
+        esc = data.rfind("\x1b")
+        if esc >= 0 and _incomplete_escape(data[esc:]):
+            data, self._pending = data[:esc], data[esc:]
+        _feed(self, data)
+
+    def take_dirty(self):
+        """Return the sorted rows changed since the last call and reset the set."""
+        rows = sorted(self.dirty)
+        self.dirty.clear()
+        return rows
+
     def render(self):
         """Plain text render (trailing spaces stripped). Reverse-video runs wrapped in [...]."""
         lines = []
@@ -164,6 +207,17 @@ def parse_raw_spans(raw, rows=40, cols=80):
     return t.render_spans()
 
 
+def _incomplete_escape(seq):
+    """True if seq (starting with ESC) is the unfinished start of a sequence _feed knows."""
+    if len(seq) == 1:
+        return True
+    if seq[1] == "[":
+        return not any(64 <= ord(ch) <= 126 for ch in seq[2:])
+    if seq[1] == "(":
+        return len(seq) < 3
+    return False
+
+
 def _feed(t, raw):
     i = 0
     L = len(raw)
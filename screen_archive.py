@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""Archive of every parsed Oxford screen, reconstructable by timestamp.
+
+Screens are the marked-up text written to magnet_out.txt (reverse video
+wrapped in [...]). Each one is split into a grid of (char, reverse) cells
+and stored as one record of a block:
+
+  - same     identical to the previous screen (just a timestamp)
+  - ref      identical to an earlier screen of the block; found by hash,
+             stored as that record's number
+  - delta    only the cells that changed since the previous screen
+  - key      the full grid (first record of every block)
+
+New records go to an uncompressed journal. Once it holds BLOCK_RECORDS
+records (or the month changes) it is zlib-compressed and appended as one
+block to the month's segment file, screens-YYYY-MM.seg. Every block starts
+with a key frame, so any screen is rebuilt by inflating a single block and
+replaying at most BLOCK_RECORDS records.
+
+Usage:
+  python3 screen_archive.py list [YYYY-MM]
+  python3 screen_archive.py show <time>              (ISO time, or unix seconds)
+  python3 screen_archive.py png  <time> output.png
+"""
+import bisect
+import hashlib
+import json
+import re
+import struct
+import sys
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+ARCHIVE_DIR = "screen_archive"
+JOURNAL = "journal.bin"
+JOURNAL_STATE = "journal.state"
+BLOCK_RECORDS = 240           # four hours of minute-level screens per block
+
+SAME, REF, DELTA, KEY = range(4)
+BLOCK_HEADER = struct.Struct("<QQII")   # t_first, t_last, n_records, payload length
+
+
+# ---------------------------------------------------------------- cell grid
+#
+# A screen is (rows, cols, chars, revs): chars is a row-major str of
+# rows*cols characters and revs a bytes of the same length (1 = reverse).
+
+def text_to_cells(text):
+    """Marked-up screen text -> (rows, cols, chars, revs)."""
+    rows_c = []
+    rows_a = []
+    for ln in text.splitlines():
+        chars = []
+        revs = []
+        in_rev = False
+        for i, ch in enumerate(ln):
+            # same bracket rules as txt_to_png: '[' only opens if a ']' follows
+            if ch == "[" and not in_rev and ln.find("]", i + 1) >= 0:
+                in_rev = True
+            elif ch == "]" and in_rev:
+                in_rev = False
+            else:
+                chars.append(ch)
+                revs.append(in_rev)
+        rows_c.append(chars)
+        rows_a.append(revs)
+    cols = max((len(r) for r in rows_c), default=0)
+    chars = "".join("".join(r).ljust(cols) for r in rows_c)
+    revs = b"".join(bytes(r).ljust(cols, b"\0") for r in rows_a)
+    return len(rows_c), cols, chars, revs
+
+
+def cells_to_text(rows, cols, chars, revs):
+    """Inverse of text_to_cells; trailing blanks dropped as in Terminal.render()."""
+    lines = []
+    for r in range(rows):
+        row_c = chars[r * cols:(r + 1) * cols].rstrip(" ")
+        row_a = revs[r * cols:r * cols + len(row_c)]
+        out = []
+        c = 0
+        for m in re.finditer(b"\x01+", row_a):
+            out.append(row_c[c:m.start()])
+            out.append("[" + row_c[m.start():m.end()] + "]")
+            c = m.end()
+        out.append(row_c[c:])
+        lines.append("".join(out))
+    return "\n".join(lines) + "\n"
+
+
+def screen_hash(rows, cols, chars, revs):
+    h = hashlib.blake2b(digest_size=8)
+    h.update(struct.pack("<II", rows, cols))
+    h.update(chars.encode("utf-8"))
+    h.update(revs)
+    return h.digest()
+
+
+# ---------------------------------------------------------------- encoding
+
+def _put_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf, i):
+    n = shift = 0
+    while True:
+        b = buf[i]
+        i += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+def _resize(rows, cols, chars, revs, new_rows, new_cols):
+    """Crop/pad a grid to new dimensions (padding with blank cells)."""
+    if (rows, cols) == (new_rows, new_cols):
+        return chars, revs
+    out_c = []
+    out_a = []
+    for r in range(new_rows):
+        if r < rows:
+            out_c.append(chars[r * cols:r * cols + min(cols, new_cols)].ljust(new_cols))
+            out_a.append(revs[r * cols:r * cols + min(cols, new_cols)].ljust(new_cols, b"\0"))
+        else:
+            out_c.append(" " * new_cols)
+            out_a.append(bytes(new_cols))
+    return "".join(out_c), b"".join(out_a)
+
+
+def _encode_record(dt, screen, prev, seen):
+    """Encode one record. prev is the previous screen, seen maps hash -> record number."""
+    rows, cols, chars, revs = screen
+    out = bytearray()
+    _put_varint(out, dt)
+    digest = screen_hash(*screen)
+    if prev is not None and screen == prev:
+        out.append(SAME)
+    elif digest in seen:
+        out.append(REF)
+        _put_varint(out, seen[digest])
+    elif prev is None:
+        raw = chars.encode("utf-8")
+        out.append(KEY)
+        _put_varint(out, rows)
+        _put_varint(out, cols)
+        _put_varint(out, len(raw))
+        out.extend(raw)
+        out.extend(revs)
+    else:
+        out.append(DELTA)
+        _put_varint(out, rows)
+        _put_varint(out, cols)
+        old_c, old_a = _resize(*prev, rows, cols)
+        changed = [i for i in range(len(chars))
+                   if chars[i] != old_c[i] or revs[i] != old_a[i]]
+        _put_varint(out, len(changed))
+        last = 0
+        for i in changed:
+            _put_varint(out, i - last)
+            _put_varint(out, (ord(chars[i]) << 1) | revs[i])
+            last = i
+    return out, digest
+
+
+def _parse_block(payload):
+    """Split a block into a list of (unix_time, kind, arg) records without replaying it."""
+    return _split_records(payload)[0]
+
+
+def _split_records(payload):
+    """
+    Parse records up to the first incomplete one, e.g. a journal write cut
+    short by a killed run. Returns (records, end), end being the byte
+    length of the complete records.
+    """
+    records = []
+    i = end = 0
+    t = 0
+    while i < len(payload):
+        try:
+            dt, i = _get_varint(payload, i)
+            kind = payload[i]
+            i += 1
+            arg = None
+            if kind == REF:
+                arg, i = _get_varint(payload, i)
+            elif kind == KEY:
+                rows, i = _get_varint(payload, i)
+                cols, i = _get_varint(payload, i)
+                n, i = _get_varint(payload, i)
+                if i + n + rows * cols > len(payload):
+                    break
+                chars = bytes(payload[i:i + n]).decode("utf-8")
+                i += n
+                revs = bytes(payload[i:i + rows * cols])
+                i += rows * cols
+                arg = (rows, cols, chars, revs)
+            elif kind == DELTA:
+                rows, i = _get_varint(payload, i)
+                cols, i = _get_varint(payload, i)
+                count, i = _get_varint(payload, i)
+                changes = []
+                pos = 0
+                for _ in range(count):
+                    gap, i = _get_varint(payload, i)
+                    code, i = _get_varint(payload, i)
+                    pos += gap
+                    changes.append((pos, code))
+                arg = (rows, cols, changes)
+            elif kind != SAME:
+                break
+        except (IndexError, UnicodeDecodeError):
+            break
+        t += dt
+        records.append((t, kind, arg))
+        end = i
+    return records, end
+
+
+def _replay(records, stop=None, every=False):
+    """Rebuild screens from parsed records.
+
+    Returns the screen at index stop (default: the last one), or with
+    every=True yields every screen in order. Only screens that a later
+    ref points at are kept as snapshots along the way.
+    """
+    if stop is None:
+        stop = len(records) - 1
+    targets = {arg for _, kind, arg in records[:stop + 1] if kind == REF}
+    snaps = {}
+    rows = cols = 0
+    chars = []
+    revs = bytearray()
+    for n in range(stop + 1):
+        _, kind, arg = records[n]
+        if kind == KEY:
+            rows, cols, c, a = arg
+            chars, revs = list(c), bytearray(a)
+        elif kind == REF:
+            rows, cols, c, a = snaps[arg]
+            chars, revs = list(c), bytearray(a)
+        elif kind == DELTA:
+            new_rows, new_cols, changes = arg
+            if (new_rows, new_cols) != (rows, cols):
+                c, a = _resize(rows, cols, "".join(chars), bytes(revs), new_rows, new_cols)
+                rows, cols = new_rows, new_cols
+                chars, revs = list(c), bytearray(a)
+            for pos, code in changes:
+                chars[pos] = chr(code >> 1)
+                revs[pos] = code & 1
+        if every or n in targets or n == stop:
+            screen = (rows, cols, "".join(chars), bytes(revs))
+            if n in targets:
+                snaps[n] = screen
+            if every:
+                yield screen
+    if not every:
+        yield screen
+
+
+# ---------------------------------------------------------------- archive
+
+def _month(t):
+    return time.strftime("%Y-%m", time.gmtime(t))
+
+
+class ScreenArchive:
+    """Append-only, delta-compressed store of rendered screens."""
+
+    def __init__(self, path=ARCHIVE_DIR):
+        self.path = Path(path)
+
+    def _segment(self, month):
+        return self.path / f"screens-{month}.seg"
+
+    def _journal(self):
+        try:
+            return self.path.joinpath(JOURNAL).read_bytes()
+        except OSError:
+            return b""
+
+    def _journal_records(self):
+        """Parse the journal once; returns its complete records."""
+        return _parse_block(self._journal())
+
+    # The journal state sidecar holds what append() needs to encode the next
+    # record (block bounds, previous screen, hash -> record number), so an
+    # append never re-reads the journal. It records the journal size it
+    # matches and is rebuilt from the journal whenever the two disagree.
+
+    def _load_state(self, size):
+        try:
+            state = json.loads(self.path.joinpath(JOURNAL_STATE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if state.get("size") != size:
+            return None
+        rows, cols, chars, revs = state["prev"]
+        state["prev"] = (rows, cols, chars, bytes.fromhex(revs))
+        state["seen"] = {bytes.fromhex(k): v for k, v in state["seen"].items()}
+        return state
+
+    def _save_state(self, state):
+        rows, cols, chars, revs = state["prev"]
+        out = dict(state, prev=[rows, cols, chars, revs.hex()],
+                   seen={k.hex(): v for k, v in state["seen"].items()})
+        tmp = self.path / (JOURNAL_STATE + ".tmp")
+        tmp.write_text(json.dumps(out), encoding="utf-8")
+        tmp.replace(self.path / JOURNAL_STATE)
+
+    def _rebuild_state(self):
+        """Replay the journal into a fresh state, dropping a half-written last record."""
+        payload = self._journal()
+        records, end = _split_records(payload)
+        if end < len(payload):
+            # drop a record left half-written by an interrupted run
+            with open(self.path / JOURNAL, "r+b") as f:
+                f.truncate(end)
+        if not records:
+            return None
+        seen = {}
+        for n, screen in enumerate(_replay(records, every=True)):
+            seen.setdefault(screen_hash(*screen), n)
+        return {"size": end, "t_first": records[0][0], "t_last": records[-1][0],
+                "count": len(records), "prev": screen, "seen": seen}
+
+    def append(self, text, t=None):
+        """Store one screen (marked-up text) taken at unix time t."""
+        t = int(time.time() if t is None else t)
+        self.path.mkdir(parents=True, exist_ok=True)
+        try:
+            size = self.path.joinpath(JOURNAL).stat().st_size
+        except OSError:
+            size = 0
+        state = self._load_state(size) if size else None
+        if size and state is None:
+            state = self._rebuild_state()
+        if state and t < state["t_last"]:
+            return
+        if state and (state["count"] >= BLOCK_RECORDS or _month(state["t_first"]) != _month(t)):
+            self._seal(state)
+            state = None
+
+        if state is None:
+            state = {"size": 0, "t_first": t, "t_last": t, "count": 0, "prev": None, "seen": {}}
+        screen = text_to_cells(text)
+        out, digest = _encode_record(t - (state["t_last"] if state["count"] else 0),
+                                     screen, state["prev"], state["seen"])
+        with open(self.path / JOURNAL, "ab") as f:
+            f.write(out)
+        state["seen"].setdefault(digest, state["count"])
+        state.update(size=state["size"] + len(out), t_last=t, count=state["count"] + 1,
+                     prev=screen)
+        self._save_state(state)
+
+    def _seal(self, state):
+        """Compress the journal into a block of its month's segment file."""
+        data = zlib.compress(self._journal()[:state["size"]], 9)
+        header = BLOCK_HEADER.pack(state["t_first"], state["t_last"], state["count"], len(data))
+        with open(self._segment(_month(state["t_first"])), "ab") as f:
+            f.write(header + data)
+        (self.path / JOURNAL).unlink()
+        (self.path / JOURNAL_STATE).unlink(missing_ok=True)
+
+    def _blocks(self, month):
+        """Yield (t_first, t_last, n_records, offset, length) for a segment file."""
+        try:
+            f = open(self._segment(month), "rb")
+        except OSError:
+            return
+        with f:
+            while True:
+                head = f.read(BLOCK_HEADER.size)
+                if len(head) < BLOCK_HEADER.size:
+                    return
+                t_first, t_last, n, length = BLOCK_HEADER.unpack(head)
+                yield t_first, t_last, n, f.tell(), length
+                f.seek(length, 1)
+
+    def _read_block(self, month, offset, length):
+        with open(self._segment(month), "rb") as f:
+            f.seek(offset)
+            return _parse_block(zlib.decompress(f.read(length)))
+
+    def _payloads(self, month, journal):
+        """Yield (t_first, t_last, loader) for every block of a month, journal last.
+        journal is the already parsed journal; loaders return parsed records."""
+        for t_first, t_last, _, offset, length in self._blocks(month):
+            yield t_first, t_last, lambda o=offset, n=length: self._read_block(month, o, n)
+        if journal and _month(journal[0][0]) == month:
+            yield journal[0][0], journal[-1][0], lambda: journal
+
+    def months(self, journal=None):
+        found = {p.stem[len("screens-"):] for p in self.path.glob("screens-*.seg")}
+        if journal is None:
+            journal = self._journal_records()
+        if journal:
+            found.add(_month(journal[0][0]))
+        return sorted(found)
+
+    def get(self, t):
+        """Return (unix_time, text) of the latest screen at or before t, or None."""
+        t = int(t)
+        month = _month(t)
+        journal = self._journal_records()
+        for m in reversed([m for m in self.months(journal) if m <= month]):
+            best = None
+            for t_first, t_last, load in self._payloads(m, journal):
+                if t_first <= t:
+                    best = load
+            if best is None:
+                continue
+            records = best()
+            hit = bisect.bisect_right([r[0] for r in records], t) - 1
+            screen = next(_replay(records, stop=hit))
+            return records[hit][0], cells_to_text(*screen)
+        return None
+
+    def iter_screens(self, start=None, end=None):
+        """Yield (unix_time, text) for every stored screen in [start, end]."""
+        journal = self._journal_records()
+        for m in self.months(journal):
+            if start is not None and m < _month(start):
+                continue
+            if end is not None and m > _month(end):
+                break
+            for t_first, t_last, load in self._payloads(m, journal):
+                if (start is not None and t_last < start) or (end is not None and t_first > end):
+                    continue
+                records = load()
+                for (rt, _, _), screen in zip(records, _replay(records, every=True)):
+                    if (start is None or rt >= start) and (end is None or rt <= end):
+                        yield rt, cells_to_text(*screen)
+
+
+def parse_time(s):
+    try:
+        return float(s)
+    except ValueError:
+        return datetime.fromisoformat(s).timestamp()
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("list", "show", "png"):
+        print("Usage:" + __doc__.split("Usage:")[1], file=sys.stderr)
+        sys.exit(2)
+    archive = ScreenArchive()
+    cmd = sys.argv[1]
+    if cmd == "list":
+        for m in sys.argv[2:] or archive.months():
+            for t_first, t_last, n, _, length in archive._blocks(m):
+                print(f"{m}  {datetime.fromtimestamp(t_first)} .. {datetime.fromtimestamp(t_last)}"
+                      f"  {n} screens, {length} bytes")
+        return
+    if len(sys.argv) < 3:
+        print("missing <time>", file=sys.stderr)
+        sys.exit(2)
+    hit = archive.get(parse_time(sys.argv[2]))
+    if hit is None:
+        print("No screen stored at or before that time.", file=sys.stderr)
+        sys.exit(1)
+    t, text = hit
+    if cmd == "show":
+        print(f"--- {datetime.fromtimestamp(t)} ---")
+        print(text, end="")
+    else:
+        if len(sys.argv) < 4:
+            print("missing output.png", file=sys.stderr)
+            sys.exit(2)
+        from txt_to_png import render_text_to_png
+        render_text_to_png(text, sys.argv[3])
+        print(f"Wrote {sys.argv[3]} ({datetime.fromtimestamp(t)})")
+
+
+if __name__ == "__main__":
+    main()
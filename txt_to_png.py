@@ -4,14 +4,32 @@ Supports reverse-video markup: text wrapped in [...] is rendered with
 a highlighted background (yellow bg, black text).
 
 Usage: python3 txt_to_png.py input.txt output.png
+       python3 txt_to_png.py --batch SOURCE OUTDIR [-j N] [--timelapse anim.gif|anim.png]
+                             [--frame-ms MS] [--start TIME] [--end TIME]
+
+Batch mode renders every screen of SOURCE (a directory of .txt files, a
+quoted glob, or a screen_archive directory / .seg file) into OUTDIR using
+a process pool, optionally assembling the frames into an animated GIF or
+APNG. Consecutive identical screens are rendered once and shown as one
+longer frame.
 Requires: Pillow (pip install pillow)
 """
+import argparse
+import calendar
+import functools
+import glob
+import io
+import os
 import sys
 import re
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 try:
-    from PIL import Image, ImageDraw, ImageFont
+    from PIL import GifImagePlugin, Image, ImageChops, ImageDraw, ImageFont
 except Exception:
     print("Pillow is required. Install with: pip install pillow", file=sys.stderr)
     raise
@@ -49,6 +67,7 @@ def _parse_spans(line: str):
     return spans if spans else [("", False)]
 
 
+@functools.lru_cache(maxsize=None)
 def _load_font(font_size=14):
     possible = [
         "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
@@ -82,25 +101,39 @@ def _char_size(font, font_size, line_spacing=6):
             return font_size / 2, font_size + 2 + line_spacing
 
 
+def _image_size(lines, char_w, line_h, padding):
+    """Pixel (width, height) of the image for the given display lines."""
+    # measure max width in chars
+    max_chars = max((len(ln) for ln in lines), default=0)
+    return round(max_chars * char_w) + padding * 2, line_h * len(lines) + padding * 2
+
+
+def text_png_size(text, font_size=14, padding=8):
+    """Pixel (width, height) render_text_to_png would produce for text."""
+    char_w, line_h = _char_size(_load_font(font_size), font_size, line_spacing=6)
+    return _image_size(text.splitlines() or [""], char_w, line_h, padding)
+
+
 def render_text_file_to_png(input_path, output_path, font_path=None, font_size=14,
                              padding=8, bg=None, fg=None):
     """
     Render input_path (text with optional [...] reverse markers) to output_path PNG.
     bg/fg kept for API compatibility but ignored (dark theme used instead).
     """
-    text  = Path(input_path).read_text(encoding="utf-8", errors="replace")
+    text = Path(input_path).read_text(encoding="utf-8", errors="replace")
+    render_text_to_png(text, output_path, font_path=font_path, font_size=font_size,
+                       padding=padding)
+
+
+def render_text_to_png(text, output_path, font_path=None, font_size=14, padding=8):
+    """Render a text string (with optional [...] reverse markers) to output_path PNG."""
     lines = text.splitlines() or [""]
 
     font      = ImageFont.truetype(font_path, font_size) if font_path and Path(font_path).exists() \
                 else _load_font(font_size)
     char_w, line_h = _char_size(font, font_size, line_spacing=6)
 
-    # measure max width in chars
-    max_chars = max((len(ln) for ln in lines), default=0)
-    img_w = round(max_chars * char_w) + padding * 2
-    img_h = line_h * len(lines) + padding * 2
-
-    img  = Image.new("RGB", (img_w, img_h), color=BG_NORMAL)
+    img  = Image.new("RGB", _image_size(lines, char_w, line_h, padding), color=BG_NORMAL)
     draw = ImageDraw.Draw(img)
 
     # Build a lookup: pixel x start for column n = round(n * char_w)
@@ -135,9 +168,252 @@ def render_text_file_to_png(input_path, output_path, font_path=None, font_size=1
     img.save(output_path)
 
 
+def _available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def collect_screens(source, start=None, end=None):
+    """
+    Return [(name, text), ...] for every screen in source, in time order.
+    source is a directory of .txt files, a glob pattern, a screen_archive
+    directory or one of its screens-YYYY-MM.seg files; start/end (unix
+    time) only apply to archives. Names start with the sequence number so
+    they stay unique: 000042-<unix time> for archives, 000042-<stem> for files.
+    """
+    path = Path(source)
+    archive_dir = None
+    if path.is_dir() and (any(path.glob("screens-*.seg")) or (path / "journal.bin").exists()):
+        archive_dir = path
+    elif path.suffix == ".seg" and path.exists():
+        # one month of an archive; segment months are UTC
+        archive_dir = path.parent
+        year, month = (int(x) for x in path.stem[len("screens-"):].split("-"))
+        first = calendar.timegm((year, month, 1, 0, 0, 0))
+        last  = calendar.timegm((year + month // 12, month % 12 + 1, 1, 0, 0, 0)) - 1
+        start = first if start is None else max(start, first)
+        end   = last if end is None else min(end, last)
+
+    if archive_dir is not None:
+        from screen_archive import ScreenArchive
+        return [(f"{n:06d}-{t}", text)
+                for n, (t, text) in enumerate(ScreenArchive(archive_dir).iter_screens(start, end))]
+
+    if path.is_dir():
+        files = sorted(path.glob("*.txt"))
+    else:
+        files = sorted(Path(p) for p in glob.glob(source))
+    return [(f"{n:06d}-{f.stem}", f.read_text(encoding="utf-8", errors="replace"))
+            for n, f in enumerate(files)]
+
+
+def _render_job(job):
+    text, output_path = job
+    render_text_to_png(text, output_path)
+    return output_path
+
+
+def render_batch(screens, outdir, jobs=None):
+    """
+    Render [(name, text), ...] to outdir/<name>.png across a process pool.
+    Consecutive identical screens are rendered once. Returns
+    [(png_path, repeat_count), ...] in input order.
+    """
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    frames = []
+    work = []
+    last = None
+    for name, text in screens:
+        if text == last:
+            frames[-1][1] += 1
+            continue
+        out = str(outdir / f"{name}.png")
+        frames.append([out, 1])
+        work.append((text, out))
+        last = text
+
+    jobs = jobs or _available_cpus()
+    if jobs == 1 or len(work) < 2:
+        for job in work:
+            _render_job(job)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for _ in pool.map(_render_job, work, chunksize=max(1, len(work) // (jobs * 4))):
+                pass
+    return [tuple(f) for f in frames]
+
+
+def _timelapse_frames(frames, size):
+    """
+    Yield (image, (x, y), repeat_count) for [(png_path, repeat_count), ...].
+    Each PNG is opened, padded to size and closed in turn; after the first
+    frame only the rectangle that changed is yielded, at offset (x, y).
+    """
+    prev = None
+    for path, repeat in frames:
+        canvas = Image.new("RGB", size, color=BG_NORMAL)
+        with Image.open(path) as im:
+            canvas.paste(im.convert("RGB"), (0, 0))
+        bbox = (0, 0) + size if prev is None else ImageChops.difference(prev, canvas).getbbox()
+        if bbox is None:
+            bbox = (0, 0, 1, 1)   # same pixels as before (e.g. change outside the canvas)
+        prev = canvas
+        yield canvas.crop(bbox), bbox[:2], repeat
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+APNG_MAX_DELAY_MS = 65535    # fcTL delay_num is 16-bit, delay_den = 1000
+GIF_MAX_DELAY_MS  = 655350   # GIF delay is 16-bit centiseconds
+
+
+def _split_delay(ms, limit):
+    """Split a frame delay into pieces of at most limit ms each."""
+    pieces = [limit] * (ms // limit)
+    if ms % limit or not pieces:
+        pieces.append(ms % limit)
+    return pieces
+
+
+def _png_chunks(img):
+    """Encode img as PNG and return its [(chunk_type, data), ...]."""
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    png = buf.getvalue()
+    chunks = []
+    i = 8
+    while i < len(png):
+        length, kind = struct.unpack(">I4s", png[i:i + 8])
+        chunks.append((kind, png[i + 8:i + 8 + length]))
+        i += 12 + length
+    return chunks
+
+
+def _write_apng(fp, frames, count, frame_ms):
+    """
+    Stream APNG chunks to fp; each frame is only held while it is written.
+    A delay too long for one frame continues in 1x1 frames that repeat a
+    pixel already on screen; count must include those.
+    """
+    fp.write(b"\x89PNG\r\n\x1a\n")
+    seq = 0
+    for img, (x, y), repeat in frames:
+        for n, delay in enumerate(_split_delay(repeat * frame_ms, APNG_MAX_DELAY_MS)):
+            part = img if n == 0 else img.crop((0, 0, 1, 1))
+            chunks = _png_chunks(part)
+            first = seq == 0
+            if first:
+                fp.write(_png_chunk(b"IHDR", chunks[0][1]))
+                fp.write(_png_chunk(b"acTL", struct.pack(">II", count, 0)))
+            fp.write(_png_chunk(b"fcTL", struct.pack(">IIIIIHHBB", seq, part.width, part.height,
+                                                     x, y, delay, 1000, 0, 0)))
+            seq += 1
+            for kind, data in chunks:
+                if kind != b"IDAT":
+                    continue
+                if first:
+                    fp.write(_png_chunk(b"IDAT", data))
+                else:
+                    fp.write(_png_chunk(b"fdAT", struct.pack(">I", seq) + data))
+                    seq += 1
+    fp.write(_png_chunk(b"IEND", b""))
+
+
+def _write_gif(fp, frames, frame_ms):
+    """
+    Stream GIF blocks to fp using the first frame's palette for every frame.
+    A delay too long for one frame continues in 1x1 frames, as for APNG.
+    """
+    palette = None
+    for img, offset, repeat in frames:
+        if palette is None:
+            palette = img.convert("P", palette=Image.ADAPTIVE)
+            header, _ = GifImagePlugin.getheader(palette.copy(), info={"loop": 0})
+            fp.write(b"".join(header))
+            frame = palette
+        else:
+            frame = img.quantize(palette=palette, dither=Image.Dither.NONE)
+        for n, delay in enumerate(_split_delay(repeat * frame_ms, GIF_MAX_DELAY_MS)):
+            part = frame if n == 0 else frame.crop((0, 0, 1, 1))
+            fp.write(b"".join(GifImagePlugin.getdata(part, offset, duration=delay)))
+    fp.write(b";")
+
+
+def write_timelapse(frames, output_path, frame_ms=200, size=None):
+    """
+    Assemble [(png_path, repeat_count), ...] into an animated GIF or APNG
+    (chosen by the output suffix). Frames are padded to size (default: the
+    first frame's size) and a repeated screen is shown for
+    repeat_count * frame_ms. Frames are streamed to the file one at a time,
+    so memory use does not grow with the number of frames. A partly
+    written file is removed if anything fails.
+    """
+    if size is None:
+        with Image.open(frames[0][0]) as im:
+            size = im.size
+    try:
+        with open(output_path, "wb") as fp:
+            if Path(output_path).suffix.lower() == ".gif":
+                _write_gif(fp, _timelapse_frames(frames, size), frame_ms)
+            else:
+                count = sum(len(_split_delay(n * frame_ms, APNG_MAX_DELAY_MS)) for _, n in frames)
+                _write_apng(fp, _timelapse_frames(frames, size), count, frame_ms)
+    except BaseException:
+        Path(output_path).unlink(missing_ok=True)
+        raise
+
+
+def batch_main(argv):
+    ap = argparse.ArgumentParser(prog="txt_to_png.py --batch",
+                                 description="Render many screens to PNG in parallel.")
+    ap.add_argument("source", help="directory of .txt files, quoted glob, or screen archive dir/.seg file")
+    ap.add_argument("outdir", help="directory for the rendered PNG frames")
+    ap.add_argument("-j", "--jobs", type=int, default=None,
+                    help="worker processes (default: available cores)")
+    ap.add_argument("--timelapse", help="also write an animated .gif or .png (APNG)")
+    ap.add_argument("--frame-ms", type=int, default=200, help="timelapse time per screen")
+    ap.add_argument("--start", help="archive sources: first time (ISO or unix seconds)")
+    ap.add_argument("--end", help="archive sources: last time (ISO or unix seconds)")
+    args = ap.parse_args(argv)
+    if not 0 < args.frame_ms <= APNG_MAX_DELAY_MS:
+        ap.error(f"--frame-ms must be between 1 and {APNG_MAX_DELAY_MS}")
+
+    from screen_archive import parse_time
+    start = parse_time(args.start) if args.start else None
+    end   = parse_time(args.end) if args.end else None
+
+    screens = collect_screens(args.source, start, end)
+    if not screens:
+        print(f"No screens found in {args.source}", file=sys.stderr)
+        sys.exit(1)
+
+    jobs = args.jobs or _available_cpus()
+    t0 = time.perf_counter()
+    frames = render_batch(screens, args.outdir, jobs)
+    elapsed = time.perf_counter() - t0
+    print(f"Rendered {len(frames)} frames ({len(screens)} screens) in {elapsed:.2f} s "
+          f"with {jobs} workers: {len(frames) / elapsed:.1f} frames/s")
+
+    if args.timelapse:
+        t0 = time.perf_counter()
+        sizes = [text_png_size(text) for _, text in screens]
+        size  = (max(w for w, _ in sizes), max(h for _, h in sizes))
+        write_timelapse(frames, args.timelapse, args.frame_ms, size)
+        print(f"Wrote {args.timelapse} ({len(frames)} frames) in {time.perf_counter() - t0:.2f} s")
+
+
 def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "--batch":
+        batch_main(sys.argv[2:])
+        return
     if len(sys.argv) < 3:
         print("Usage: python3 txt_to_png.py input.txt output.png", file=sys.stderr)
+        print("       python3 txt_to_png.py --batch SOURCE OUTDIR [options]", file=sys.stderr)
         sys.exit(2)
     render_text_file_to_png(sys.argv[1], sys.argv[2])
     print(f"Wrote {sys.argv[2]}")